@@ -0,0 +1,69 @@
+import sys
+import time
+import tempfile
+import numpy as np
+from vector_store import QuantizedVectorStore
+
+# Memory and recall of the quantized memory store against exact float32 search,
+# which is what the chromadb collections hold today.
+#   python bench_vector_store.py [n_memories] [n_queries]
+#
+# ada-002 embeddings are unit vectors that sit close together (cosine ~0.7-0.9
+# between unrelated texts), so the synthetic data shares a common direction and
+# is grouped around topics rather than being uniform noise.
+
+DIM = 1536
+
+def synthetic_embeddings(n, rng, n_topics=50):
+    common = rng.normal(size=DIM)
+    topics = rng.normal(size=(n_topics, DIM))
+    topic_of = rng.integers(0, n_topics, size=n)
+    vectors = 3.0 * common + 1.5 * topics[topic_of] + rng.normal(size=(n, DIM))
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def recall(found, expected):
+    return np.mean([len(set(f) & set(e)) / len(e) for f, e in zip(found, expected)])
+
+def run(n_memories, n_queries, k=(1, 10)):
+    rng = np.random.default_rng(0)
+    memories = synthetic_embeddings(n_memories, rng)
+    # queries are paraphrases: a stored memory plus noise
+    queries = memories[rng.integers(0, n_memories, size=n_queries)] + 0.03 * rng.normal(size=(n_queries, DIM))
+    queries = (queries / np.linalg.norm(queries, axis=1, keepdims=True)).astype(np.float32)
+    ids = [str(i) for i in range(n_memories)]
+    documents = [f"memory {i}" for i in range(n_memories)]
+
+    baseline = memories.astype(np.float32)
+    baseline_bytes = baseline.nbytes
+    start = time.perf_counter()
+    exact = {n: [np.argsort(-(baseline @ q))[:n].tolist() for q in queries] for n in k}
+    baseline_ms = (time.perf_counter() - start) * 1000 / (n_queries * len(k))
+
+    print(f"{n_memories} memories x {DIM} dims, {n_queries} queries")
+    print(f"{'store':<22}{'MB':>8}{'reduction':>11}" + "".join(f"{f'recall@{n}':>11}" for n in k) + f"{'ms/query':>10}")
+    print(f"{'float32 (current)':<22}{baseline_bytes / 1e6:>8.2f}{1.0:>10.2f}x" + "".join(f"{1.0:>11.4f}" for _ in k) + f"{baseline_ms:>10.2f}")
+
+    with tempfile.TemporaryDirectory() as storage_dir:
+        for precision, rescore, outlier in [("float16", 0, False), ("int8", 0, False), ("int8", 20, False), ("int8", 0, True)]:
+            store = QuantizedVectorStore(f"bench_{precision}_{rescore}_{outlier}", precision, rescore=rescore, storage_dir=storage_dir)
+            # add in small batches, like Database adding memories over time
+            for i in range(0, n_memories, 100):
+                store.add(documents[i:i + 100], memories[i:i + 100], ids[i:i + 100])
+            if outlier:
+                # a one-hot vector has the largest possible component; it must not
+                # cost precision in the other vectors
+                one_hot = np.zeros(DIM, dtype=np.float32)
+                one_hot[0] = 1.0
+                store.add(["outlier"], one_hot, [str(n_memories)])
+            start = time.perf_counter()
+            found = {n: [[int(i) for i in store.query(q, n_results=n)["ids"][0]] for q in queries] for n in k}
+            ms = (time.perf_counter() - start) * 1000 / (n_queries * len(k))
+            label = precision + (f" + rescore {rescore}" if rescore else "") + (" + outlier" if outlier else "")
+            print(f"{label:<22}{store.nbytes / 1e6:>8.2f}{baseline_bytes / store.nbytes:>10.2f}x"
+                  + "".join(f"{recall(found[n], exact[n]):>11.4f}" for n in k) + f"{ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    n_memories = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    n_queries = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    run(n_memories, n_queries)
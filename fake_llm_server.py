@@ -0,0 +1,77 @@
+import json
+import time
+import random
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local stand-in for the OpenAI API with injected delays, for exercising
+# llm_client.py (timeouts, retries, hedging) without network access.
+#   python fake_llm_server.py --port 8765 --delay 0.2 --tail 5.0 --tail-prob 0.05
+#   OPENAI_API_BASE=http://127.0.0.1:8765/v1 OPENAI_API_KEY=fake python main.py
+
+EMPTY_TOOLS = json.dumps({"tools": []})
+EMPTY_PLAN = json.dumps({"actions": [{"action": "speak", "parameters": {"speech": "Hello"}}]})
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        config = self.server.config
+
+        if random.random() < config.error_prob:
+            return self.reply(503, {"error": {"message": "injected failure", "type": "server_error"}})
+        delay = config.tail if random.random() < config.tail_prob else config.delay
+        time.sleep(delay * random.uniform(0.8, 1.2))
+
+        if self.path.endswith("/chat/completions"):
+            system_prompt = body.get("messages", [{}])[0].get("content", "")
+            content = EMPTY_TOOLS if "memory tools" in system_prompt else EMPTY_PLAN
+            self.reply(200, {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "fake"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            })
+        elif self.path.endswith("/embeddings"):
+            inputs = body.get("input", [])
+            inputs = [inputs] if isinstance(inputs, str) else inputs
+            self.reply(200, {
+                "object": "list",
+                "model": body.get("model", "fake"),
+                "data": [{"object": "embedding", "index": i, "embedding": [random.gauss(0, 1) for _ in range(config.dim)]}
+                         for i in range(len(inputs))],
+                "usage": {"prompt_tokens": 0, "total_tokens": 0},
+            })
+        else:
+            self.reply(404, {"error": {"message": f"Unknown path {self.path}", "type": "invalid_request_error"}})
+
+    def reply(self, status, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake OpenAI API server with injected delays")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=0.2, help="typical response delay in seconds")
+    parser.add_argument("--tail", type=float, default=5.0, help="delay of a tail (slow) response in seconds")
+    parser.add_argument("--tail-prob", type=float, default=0.05, help="probability of a tail response")
+    parser.add_argument("--error-prob", type=float, default=0.0, help="probability of a 503 response")
+    parser.add_argument("--dim", type=int, default=1536, help="embedding dimension")
+    config = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", config.port), FakeLLMHandler)
+    server.config = config
+    print(f"Fake LLM server on http://127.0.0.1:{config.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
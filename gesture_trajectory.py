@@ -0,0 +1,266 @@
+import os
+import re
+import time
+import numpy as np
+
+# Directory holding the precomputed gesture trajectories used by main.py
+TRAJECTORY_DIR = "trajectories"
+
+# Common interactions served from the library instead of running the gesture live
+COMMON_GESTURES = [
+    ("wave", {"hand": "right"}),
+    ("wave", {"hand": "left"}),
+    ("handshake", {"hand": "right"}),
+    ("handshake", {"hand": "left"}),
+    ("nod_head", {"direction": "up_down"}),
+    ("nod_head", {"direction": "right_left"}),
+]
+
+# Gestures whose last setAngles call returns to the pose they started from
+RESTORING_GESTURES = {"wave", "nod_head"}
+
+class Trajectory():
+    """
+    Array-backed joint trajectory.
+
+    Each keyframe is one row: the time offset from the start of the recording,
+    the speed passed to setAngles and the target angle of every joint. Joints
+    that were not commanded in a keyframe are stored as NaN.
+
+    `restores_pose` marks gestures whose last keyframe returns to the pose the
+    robot was in when the gesture started (wave, nod_head). That keyframe is
+    replaced with the current pose at replay time.
+    """
+    def __init__(self, joint_names, times, angles, speeds, restores_pose=False):
+        self.joint_names = list(joint_names)
+        self.times = np.asarray(times, dtype=np.float64)
+        self.angles = np.asarray(angles, dtype=np.float32).reshape(len(self.times), len(self.joint_names))
+        self.speeds = np.asarray(speeds, dtype=np.float32)
+        self.restores_pose = bool(restores_pose)
+
+    def __len__(self):
+        return len(self.times)
+
+    @property
+    def duration(self):
+        return float(self.times[-1]) if len(self.times) else 0.0
+
+    def save(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        np.savez_compressed(
+            path,
+            joint_names=np.array(self.joint_names),
+            times=self.times,
+            angles=self.angles,
+            speeds=self.speeds,
+            restores_pose=self.restores_pose
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            restores_pose = bool(data["restores_pose"]) if "restores_pose" in data.files else False
+            return cls(data["joint_names"].tolist(), data["times"], data["angles"], data["speeds"], restores_pose)
+
+
+class TrajectoryRecorder():
+    """
+    Records every setAngles call made on a qibullet robot.
+
+    While recording, the robot's setAngles is wrapped so that the targets still
+    reach the simulation. Calls for different joints issued within `merge_window`
+    seconds of each other with the same speed are merged into one keyframe, and calls that do
+    not change any target by more than `tolerance` are dropped (the joint sliders
+    resend every joint on every step). With `tolerance=None` every call is kept.
+    """
+    def __init__(self, robot, merge_window: float = 0.005, tolerance: float = 1e-4):
+        self.robot = robot
+        self.merge_window = merge_window
+        self.tolerance = tolerance
+        self.recording = False
+
+    def start(self):
+        self.joint_names = []
+        self.joint_index = {}
+        self.times = []
+        self.rows = []
+        self.speeds = []
+        self.last_targets = {}
+        self.start_time = time.monotonic()
+        self.recording = True
+
+        original = self.robot.setAngles
+        def set_angles(joint_names, joint_values, percentage_speed):
+            self.record(joint_names, joint_values, percentage_speed)
+            return original(joint_names, joint_values, percentage_speed)
+
+        # instance attribute shadows the class method, so goToPosture is recorded as well
+        self.robot.setAngles = set_angles
+
+    def record(self, joint_names, joint_values, percentage_speed):
+        if not self.recording:
+            return
+        if isinstance(joint_names, str):
+            joint_names = [joint_names]
+            joint_values = [joint_values]
+
+        targets = {}
+        for name, value in zip(joint_names, joint_values):
+            value = float(np.ravel(value)[0])
+            if self.tolerance is None or abs(self.last_targets.get(name, np.inf) - value) > self.tolerance:
+                targets[name] = value
+        if not targets:
+            return
+        self.last_targets.update(targets)
+
+        for name in targets:
+            if name not in self.joint_index:
+                self.joint_index[name] = len(self.joint_names)
+                self.joint_names.append(name)
+                for row in self.rows:
+                    row.append(np.nan)
+
+        now = time.monotonic() - self.start_time
+        speed = float(percentage_speed)
+        # merge into the last keyframe only if it does not already command one of these joints
+        if (self.rows and now - self.times[-1] <= self.merge_window and self.speeds[-1] == speed
+                and all(np.isnan(self.rows[-1][self.joint_index[name]]) for name in targets)):
+            row = self.rows[-1]
+        else:
+            row = [np.nan] * len(self.joint_names)
+            self.rows.append(row)
+            self.times.append(now)
+            self.speeds.append(speed)
+        for name, value in targets.items():
+            row[self.joint_index[name]] = value
+
+    def stop(self):
+        self.recording = False
+        # drop the wrapper so the class method is used again
+        self.robot.__dict__.pop("setAngles", None)
+        angles = np.array(self.rows, dtype=np.float32).reshape(len(self.rows), len(self.joint_names))
+        return Trajectory(self.joint_names, self.times, angles, self.speeds)
+
+
+class TrajectoryPlayer():
+    """
+    Streams a recorded trajectory back to the robot with one batched setAngles
+    call per keyframe. With a RobotStateSnapshot, gestures that restore the
+    starting pose return to the pose the robot is in now, like the live gesture.
+    """
+    def __init__(self, robot, state=None):
+        self.robot = robot
+        self.state = state
+
+    def play(self, trajectory, time_scale: float = 1.0):
+        names = np.array(trajectory.joint_names)
+        angles = trajectory.angles
+        if trajectory.restores_pose and self.state is not None and len(trajectory):
+            angles = angles.copy()
+            mask = ~np.isnan(angles[-1])
+            angles[-1, mask] = self.state.positions_of(names[mask].tolist())
+
+        start = time.monotonic()
+        for t, row, speed in zip(trajectory.times, angles, trajectory.speeds):
+            delay = start + t * time_scale - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            mask = ~np.isnan(row)
+            self.robot.setAngles(names[mask].tolist(), row[mask].tolist(), float(speed))
+
+        # returns the wall time taken, useful for comparing replays against the recording
+        return time.monotonic() - start
+
+
+class TrajectoryLibrary():
+    """
+    Precomputed trajectories keyed by planner action and parameters,
+    e.g. wave(hand=right) is stored as `wave_hand-right.npz`.
+    Only the gestures in `gestures` are looked up, so speech and other actions
+    never touch the disk or the cache.
+    """
+    def __init__(self, directory: str = TRAJECTORY_DIR, gestures=None):
+        self.directory = directory
+        self.cache = {}
+        self.gestures = {self.key(action, params) for action, params in (gestures or COMMON_GESTURES)}
+
+    @staticmethod
+    def key(action, params=None):
+        parts = [action] + [f"{k}-{v}" for k, v in sorted((params or {}).items())]
+        return re.sub(r"[^A-Za-z0-9_.-]", "", "_".join(parts))
+
+    def path(self, action, params=None):
+        return os.path.join(self.directory, self.key(action, params) + ".npz")
+
+    def get(self, action, params=None):
+        if self.key(action, params) not in self.gestures:
+            return None
+        path = self.path(action, params)
+        if path not in self.cache:
+            self.cache[path] = Trajectory.load(path) if os.path.exists(path) else None
+        return self.cache[path]
+
+    def save(self, trajectory, action, params=None):
+        path = self.path(action, params)
+        trajectory.save(path)
+        self.gestures.add(self.key(action, params))
+        self.cache[path] = trajectory
+        return path
+
+
+def record_gesture(nao, action, params=None):
+    """
+    Run a Nao gesture live and return its trajectory.
+    """
+    # keep every call so the last keyframe holds all joints of the gesture's last setAngles
+    recorder = TrajectoryRecorder(nao.robot, tolerance=None)
+    recorder.start()
+    try:
+        getattr(nao, action)(**(params or {}))
+    finally:
+        trajectory = recorder.stop()
+    trajectory.restores_pose = action in RESTORING_GESTURES
+    return trajectory
+
+
+def replay_timing(nao, paths):
+    """
+    Replay recorded trajectories (e.g. plans saved by main.py) and compare the
+    replay time with the recorded duration.
+    """
+    player = TrajectoryPlayer(nao.robot, nao.state)
+    for path in paths:
+        trajectory = Trajectory.load(path)
+        nao.reset_nao_pose()
+        time.sleep(1.0)
+        elapsed = player.play(trajectory)
+        print(f"{path}: {len(trajectory)} keyframes, recorded {trajectory.duration:.2f}s, "
+              f"replayed {elapsed:.2f}s ({elapsed - trajectory.duration:+.3f}s)")
+
+
+if __name__ == "__main__":
+    # python gesture_trajectory.py                  record COMMON_GESTURES into trajectories/
+    # python gesture_trajectory.py replay <file>...  replay recordings and report their timing
+    import sys
+    from nao_agent import Nao
+
+    nao = Nao(gui=False)
+    time.sleep(1.0)  # Allow time for the robot to initialize
+
+    if len(sys.argv) > 1 and sys.argv[1] == "replay":
+        replay_timing(nao, sys.argv[2:])
+        nao.shutdown()
+        sys.exit(0)
+
+    library = TrajectoryLibrary()
+
+    for action, params in COMMON_GESTURES:
+        nao.reset_nao_pose()
+        time.sleep(1.0)
+        trajectory = record_gesture(nao, action, params)
+        path = library.save(trajectory, action, params)
+        print(f"Recorded {action}({params}): {len(trajectory)} keyframes, {trajectory.duration:.2f}s -> {path}")
+
+    nao.shutdown()
@@ -0,0 +1,221 @@
+import os
+import sys
+import time
+import random
+import bisect
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import openai
+from openai import error as openai_error
+
+# Errors worth another attempt. Other OpenAI errors (bad request, auth) are raised right away as LLMError.
+RETRYABLE_ERRORS = (
+    openai_error.Timeout,
+    openai_error.APIError,
+    openai_error.APIConnectionError,
+    openai_error.RateLimitError,
+    openai_error.ServiceUnavailableError,
+    ConnectionError,
+    TimeoutError,
+)
+
+class LLMError(Exception):
+    pass
+
+class LLMTimeoutError(LLMError):
+    pass
+
+
+def openai_transport(method, request_timeout, **kwargs):
+    """
+    Default transport: one OpenAI API request. `api_base` in kwargs points it
+    at another server, e.g. fake_llm_server.py.
+    """
+    if method == "chat":
+        return openai.ChatCompletion.create(request_timeout=request_timeout, **kwargs)
+    elif method == "embedding":
+        return openai.Embedding.create(request_timeout=request_timeout, **kwargs)
+    raise ValueError(f"Unknown method '{method}'")
+
+
+class LatencyHistogram():
+    """
+    Fixed-bucket latency histogram plus a window of recent samples for percentiles.
+    """
+    BUCKETS = [0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0, float("inf")]
+
+    def __init__(self, window: int = 1000):
+        self.counts = [0] * len(self.BUCKETS)
+        self.samples = deque(maxlen=window)
+        self.lock = threading.Lock()
+
+    def record(self, seconds):
+        with self.lock:
+            self.counts[bisect.bisect_left(self.BUCKETS, seconds)] += 1
+            self.samples.append(seconds)
+
+    def percentile(self, q):
+        with self.lock:
+            samples = sorted(self.samples)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(q / 100.0 * len(samples)))]
+
+    def summary(self):
+        return {
+            "count": sum(self.counts),
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "buckets": dict(zip(self.BUCKETS, self.counts)),
+        }
+
+
+class LLMClient():
+    """
+    Shared client for all LLM calls.
+
+    - timeout: deadline for the whole call, retries included
+    - max_concurrency: cap on requests in flight, hedges included; extra calls queue
+    - max_retries / backoff: retries with full jitter, backoff * 2**attempt seconds at most
+    - hedge_after: if set, fire a duplicate request when the first one has not
+      answered after this many seconds and take whichever returns first
+    """
+    def __init__(self, timeout: float = 30.0, max_concurrency: int = 4, max_retries: int = 2,
+                 backoff: float = 0.5, hedge_after: float = None, api_base: str = None, transport=None):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.hedge_after = hedge_after
+        self.api_base = api_base
+        self.transport = transport or openai_transport
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="llm")
+        self.latency = {"chat": LatencyHistogram(), "embedding": LatencyHistogram()}
+        self.stats = {"calls": 0, "retries": 0, "hedges": 0, "hedge_wins": 0, "timeouts": 0, "errors": 0}
+        self.stats_lock = threading.Lock()
+
+    def chat_completion(self, timeout: float = None, hedge_after: float = None, **kwargs):
+        return self.call("chat", kwargs, timeout, hedge_after)
+
+    def embedding(self, timeout: float = None, hedge_after: float = None, **kwargs):
+        return self.call("embedding", kwargs, timeout, hedge_after)
+
+    def count(self, key):
+        with self.stats_lock:
+            self.stats[key] += 1
+
+    def call(self, method, kwargs, timeout=None, hedge_after=None):
+        if self.api_base and "api_base" not in kwargs:
+            kwargs = dict(kwargs, api_base=self.api_base)
+        start = time.monotonic()
+        deadline = start + (timeout or self.timeout)
+        hedge_after = hedge_after if hedge_after is not None else self.hedge_after
+        self.count("calls")
+
+        attempt = 0
+        try:
+            while True:
+                try:
+                    return self.attempt(method, kwargs, deadline, hedge_after)
+                except LLMTimeoutError:
+                    self.count("timeouts")
+                    raise
+                except RETRYABLE_ERRORS as e:
+                    attempt += 1
+                    delay = random.uniform(0, self.backoff * 2 ** attempt)
+                    if attempt > self.max_retries or time.monotonic() + delay >= deadline:
+                        self.count("errors")
+                        raise LLMError(f"{method} request failed after {attempt} attempt(s): {e}") from e
+                    print(f"LLM {method} request failed ({e}), retrying in {delay:.2f}s")
+                    self.count("retries")
+                    time.sleep(delay)
+                except openai_error.OpenAIError as e:
+                    # invalid request, auth, context length: not retried, but callers still see LLMError
+                    self.count("errors")
+                    raise LLMError(f"{method} request failed: {e}") from e
+        finally:
+            # failed and timed out calls are the tail, so they count too
+            self.latency[method].record(time.monotonic() - start)
+
+    def attempt(self, method, kwargs, deadline, hedge_after):
+        def request():
+            # the request itself must not outlive the call deadline
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise LLMTimeoutError(f"{method} request timed out in queue")
+            return self.transport(method, remaining, **kwargs)
+
+        futures = [self.executor.submit(request)]
+        done, pending = wait(futures, timeout=self.remaining(deadline, hedge_after))
+        if not done and hedge_after is not None and time.monotonic() < deadline:
+            self.count("hedges")
+            futures.append(self.executor.submit(request))
+
+        error = None
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=self.remaining(deadline), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future.exception() is None:
+                    if future is not futures[0]:
+                        self.count("hedge_wins")
+                    for other in pending:
+                        other.cancel()
+                    return future.result()
+                error = future.exception()
+
+        for future in pending:
+            future.cancel()
+        if error is not None and not pending:
+            raise error
+        raise LLMTimeoutError(f"{method} request exceeded its deadline")
+
+    @staticmethod
+    def remaining(deadline, cap=None):
+        remaining = max(0.0, deadline - time.monotonic())
+        return remaining if cap is None else min(cap, remaining)
+
+    def report(self):
+        lines = [f"LLM client stats: {self.stats}"]
+        for method, histogram in self.latency.items():
+            summary = histogram.summary()
+            if summary["count"]:
+                lines.append(f"{method}: n={summary['count']} p50={summary['p50']:.3f}s "
+                             f"p95={summary['p95']:.3f}s p99={summary['p99']:.3f}s")
+        return "\n".join(lines)
+
+
+def _env_float(name, default=None):
+    value = os.getenv(name)
+    return float(value) if value else default
+
+# Client shared by the memory agent, the planner and the memory database
+shared_client = LLMClient(
+    timeout=_env_float("LLM_TIMEOUT", 30.0),
+    max_concurrency=int(_env_float("LLM_MAX_CONCURRENCY", 4)),
+    max_retries=int(_env_float("LLM_MAX_RETRIES", 2)),
+    hedge_after=_env_float("LLM_HEDGE_AFTER"),
+    api_base=os.getenv("OPENAI_API_BASE"),
+)
+
+
+if __name__ == "__main__":
+    # Load check against a server, e.g.:
+    #   python fake_llm_server.py --port 8765 --delay 0.2 --tail 5.0 --tail-prob 0.05
+    #   python llm_client.py http://127.0.0.1:8765/v1 200 1.0
+    api_base = sys.argv[1] if len(sys.argv) > 1 else "http://127.0.0.1:8765/v1"
+    n_calls = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    hedge_after = float(sys.argv[3]) if len(sys.argv) > 3 else None
+
+    openai.api_key = openai.api_key or "fake-key"
+    client = LLMClient(timeout=10.0, hedge_after=hedge_after, api_base=api_base)
+    for _ in range(n_calls):
+        try:
+            client.chat_completion(model="fake", messages=[{"role": "user", "content": "ping"}])
+        except LLMError as e:
+            print(f"Call failed: {e}")
+    print(client.report())
+    client.executor.shutdown(wait=False)
@@ -1,6 +1,11 @@
 import sys
 from nao_agent import Nao
 from robot_planner import RobotPlanner  # Import the RobotPlanner class
+from gesture_trajectory import TrajectoryLibrary, TrajectoryPlayer, TrajectoryRecorder
+from llm_client import shared_client, LLMError
+from vector_store import QuantizedVectorStore
+from perception import PerceptionWorker
+import os
 import time
 import chromadb
 # from openai import OpenAI 
@@ -8,17 +13,34 @@ import openai
 from datetime import datetime
 import json
 import re
+import uuid
 import http.client
 
 # client = OpenAI()
 
-def execute_plan(nao, plan):
+# Directory to record every executed plan into, for replaying with gesture_trajectory.py
+PLAN_RECORD_DIR = os.getenv("PLAN_RECORD_DIR")
+
+def execute_plan(nao, plan, library=None, record_path=None):
     """
     Execute the generated plan using the Nao robot.
+    Gestures with a precomputed trajectory in `library` are replayed instead of run live.
+    With `record_path`, the joint targets and timings of the whole plan are saved there as one trajectory.
     """
     if not plan or "actions" not in plan:
         print("Invalid plan received")
         return
+
+    if record_path:
+        recorder = TrajectoryRecorder(nao.robot)
+        recorder.start()
+        try:
+            execute_plan(nao, plan, library)
+        finally:
+            trajectory = recorder.stop()
+            trajectory.save(record_path)
+            print(f"Recorded plan: {len(trajectory)} keyframes, {trajectory.duration:.2f}s -> {record_path}")
+        return
     
     print("\n=== Executing Action Plan ===")
     for i, action_item in enumerate(plan["actions"]):
@@ -26,6 +48,12 @@ def execute_plan(nao, plan):
         params = action_item.get("parameters", {})
         
         print(f"Step {i+1}: Executing {action} with parameters {params}")
+
+        trajectory = library.get(action, params) if library else None
+        if trajectory is not None:
+            TrajectoryPlayer(nao.robot, nao.state).play(trajectory)
+            time.sleep(1.0)
+            continue
         
         # Map the action to the corresponding Nao method
         if action == "speak":
@@ -59,21 +87,95 @@ def execute_plan(nao, plan):
         
         time.sleep(1.0)  # Add a delay between actions for better visualization
 
-client_chroma = chromadb.Client()
-
-COLLECTION_EPISODIC = client_chroma.create_collection("episodic_collection")
-COLLECTION_SEMANTIC = client_chroma.create_collection("semantic_collection")
-COLLECTION_PROCEDURAL = client_chroma.create_collection("procedural_collection")
+# persistent, so memories (and the user profile built from them) carry over between sessions
+CHROMA_PATH = os.path.join("database_storage", "chroma")
+client_chroma = chromadb.PersistentClient(path=CHROMA_PATH)
+
+# Optional compact storage for memory vectors: "float16" or "int8"
+MEMORY_QUANTIZATION = os.getenv("MEMORY_QUANTIZATION")
+# Number of candidates re-scored at full precision from disk (0 disables)
+MEMORY_RESCORE = int(os.getenv("MEMORY_RESCORE", "20"))
+
+if MEMORY_QUANTIZATION:
+    COLLECTION_EPISODIC = QuantizedVectorStore("episodic_collection", MEMORY_QUANTIZATION, rescore=MEMORY_RESCORE)
+    COLLECTION_SEMANTIC = QuantizedVectorStore("semantic_collection", MEMORY_QUANTIZATION, rescore=MEMORY_RESCORE)
+    COLLECTION_PROCEDURAL = QuantizedVectorStore("procedural_collection", MEMORY_QUANTIZATION, rescore=MEMORY_RESCORE)
+else:
+    COLLECTION_EPISODIC = client_chroma.get_or_create_collection("episodic_collection")
+    COLLECTION_SEMANTIC = client_chroma.get_or_create_collection("semantic_collection")
+    COLLECTION_PROCEDURAL = client_chroma.get_or_create_collection("procedural_collection")
+
+class UserProfile():
+    """
+    Core semantic and episodic memories of the session's user, kept in RAM.
+    Loaded with one bulk read per collection at session start and updated on every save,
+    so planners get them without a search round-trip. The chromadb collections persist
+    between sessions; QuantizedVectorStore does not, so with it the profile only holds
+    memories saved in the current session.
+    Memories belong to a user through the "user" metadata tag written by Database on save.
+    """
+    def __init__(self, username, max_items=50):
+        self.username = username
+        # case-insensitive, so "tamim" and "Tamim" are the same user
+        self.user_key = username.strip().lower()
+        self.max_items = max_items
+        self.memories = {"semantic": [], "episodic": []}
+
+    def load(self, database):
+        if not self.user_key:
+            return self
+        collections = {"semantic": database.collections_semantic, "episodic": database.collections_episodic}
+        for memory_type, collection in collections.items():
+            results = collection.get(where={"user": self.user_key})
+            # ids are save timestamps, keep the most recent memories
+            documents = [document for _, document in sorted(zip(results["ids"], results["documents"]))]
+            self.memories[memory_type] = documents[-self.max_items:]
+        return self
+
+    def update(self, memory_type, knowledge):
+        """
+        Add memories just saved for this user, see Database.user_metadatas.
+        """
+        if memory_type not in self.memories:
+            return
+        memories = self.memories[memory_type]
+        for document in knowledge:
+            if document not in memories:
+                memories.append(document)
+        del memories[:-self.max_items]
+
+    def text(self):
+        parts = []
+        if self.memories["semantic"]:
+            parts.append("Facts: " + " ".join(self.memories["semantic"]))
+        if self.memories["episodic"]:
+            parts.append("Response preferences: " + " ".join(self.memories["episodic"]))
+        return " ".join(parts)
 
 class Database():
     def __init__(self):
-        self.client = chromadb.Client()
+        self.client = client_chroma
         self.collections_episodic = COLLECTION_EPISODIC
         self.collections_semantic = COLLECTION_SEMANTIC
         self.collections_procedural = COLLECTION_PROCEDURAL
+        # profile of the current user, set in main once the username is known
+        self.profile = None
+
+    @staticmethod
+    def memory_ids(knowledge):
+        # save timestamp first so ids still sort chronologically; the suffix keeps
+        # memories saved in the same second from being dropped as duplicates
+        stamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S-%f")
+        return [f"{stamp}_{i:04d}_{uuid.uuid4().hex[:8]}" for i in range(len(knowledge))]
+
+    def user_metadatas(self, knowledge):
+        # tag memories with the session user so the profile can load them back
+        if not self.profile or not self.profile.user_key:
+            return None
+        return [{"user": self.profile.user_key} for _ in knowledge]
   
     def embed(self, messages):
-        response = openai.Embedding.create(
+        response = shared_client.embedding(
             input=messages,
             model="text-embedding-ada-002" 
         )
@@ -84,44 +186,51 @@ class Database():
     def save_semantic_memory(self, knowledge):
         embeddings = self.embed(knowledge)
        
-        ids = [datetime.now().strftime("%Y-%m-%d_%H-%M-%S") for _ in knowledge]
+        ids = self.memory_ids(knowledge)
       
 
         self.collections_semantic.add(
             documents=knowledge,
             embeddings=embeddings,
+            metadatas=self.user_metadatas(knowledge),
             ids= ids
         )
 
         print(f"{knowledge} saved in semantic memory")  
+        if self.profile:
+            self.profile.update("semantic", knowledge)
 
         return "Added to collection!"
     
     def save_episodic_memory(self, knowledge):
         embeddings = self.embed(knowledge)
-        ids = [datetime.now().strftime("%Y-%m-%d_%H-%M-%S") for _ in knowledge]
+        ids = self.memory_ids(knowledge)
 
 
         self.collections_episodic.add(
             documents=knowledge,
             embeddings=embeddings,
+            metadatas=self.user_metadatas(knowledge),
             ids= ids
         )
 
         print(f"{knowledge} saved in episodic memory")
+        if self.profile:
+            self.profile.update("episodic", knowledge)
 
 
         return "Added to collection!"
 
     def save_procedural_memory(self, knowledge):
         embeddings = self.embed(knowledge)
-        ids = [datetime.now().strftime("%Y-%m-%d_%H-%M-%S") for _ in knowledge]
+        ids = self.memory_ids(knowledge)
 
         
         
         self.collections_procedural.add(
             documents=knowledge,
             embeddings=embeddings,
+            metadatas=self.user_metadatas(knowledge),
             ids=ids
         )
         print(f"{knowledge} saved in procedural memory")
@@ -215,12 +324,16 @@ class MemoryToolExecutor():
             print(f"Executing {function_name} with {arguments}")
             
             # Call execute_method
-            if "search" in function_name:
-                info = self.execute_method(function_name, arguments)
-                if info:
-                    searched_info += ", ".join(map(str, info)) 
-            else:
-                self.execute_method(function_name, [arguments])
+            try:
+                if "search" in function_name:
+                    info = self.execute_method(function_name, arguments)
+                    if info:
+                        searched_info += ", ".join(map(str, info)) 
+                else:
+                    self.execute_method(function_name, [arguments])
+            except LLMError as e:
+                # embedding failed or timed out, skip this tool and keep the turn going
+                print(f"Error executing {function_name}: {str(e)}")
             
         return searched_info
 
@@ -263,20 +376,28 @@ class MemoryAgent():
             }
             """
     
-    def generate_memory_plan(self, instruction):
+    def generate_memory_plan(self, instruction, profile=""):
         self.messages = [
                 {"role": "system", "content": self.system_prompt},
                 {"role": "user", "content": f"Instruction: {instruction}\n\n."}
             ]
-        response = openai.ChatCompletion.create(
-                model=self.model,
-                messages=self.messages,
-                temperature=0.3,
-                max_tokens=self.max_completion_length,
-                top_p=0.4,
-                frequency_penalty=0.0,
-                presence_penalty=0.0
-            )
+        if profile:
+            self.messages.insert(1, {"role": "system", "content": f"You already know this about the user: {profile}\n"
+                                     "Don't search for anything answered here, only search memory for things outside it."})
+        try:
+            response = shared_client.chat_completion(
+                    model=self.model,
+                    messages=self.messages,
+                    temperature=0.3,
+                    max_tokens=self.max_completion_length,
+                    top_p=0.4,
+                    frequency_penalty=0.0,
+                    presence_penalty=0.0
+                )
+        except LLMError as e:
+            # carry on with the turn without memory tools
+            print(f"Error generating memory plan: {str(e)}")
+            return '{"tools": []}'
 
         
 
@@ -295,12 +416,23 @@ if __name__ == "__main__":
     nao = Nao(gui=True)
     time.sleep(1.0)  # Allow time for the robot to initialize
 
+    # Start the background perception stage
+    perception = PerceptionWorker(nao)
+    nao.perception = perception
+    perception.start()
+
     # Initialize the RobotPlanner
     planner = RobotPlanner()
     executor = MemoryToolExecutor()
     mem = MemoryAgent()
-
-    username = input("Username: ")
+    library = TrajectoryLibrary()
+
+    username = input("Username: ").strip()
+    while not username:
+        username = input("Username: ").strip()
+    # prefetch the user's core memories once for the whole session
+    profile = UserProfile(username).load(database)
+    database.profile = profile
     # Continuous input loop
     while True:
         # Prompt the user for an instruction
@@ -311,13 +443,13 @@ if __name__ == "__main__":
             print("Stopping the Nao robot.")
             break
 
-        memory_tools_response = mem.generate_memory_plan(f"Username: {username}, Query: {instruction}")
+        memory_tools_response = mem.generate_memory_plan(f"Username: {username}, Query: {instruction}", profile.text())
         saved_info = executor.execute_memory_plan(memory_tools_response)
 
-        memory = ""
+        memory = profile.text()
         if saved_info:
             print(f" Saved info: {saved_info}")
-            memory = saved_info
+            memory = f"{memory} {saved_info}".strip()
             # exit()
             # memory = " ".join(saved_info["documents"])  
 
@@ -326,15 +458,25 @@ if __name__ == "__main__":
 
         formatted_instruction = f"{username} says, {instruction}"
 
-        plan = planner.generate_plan(formatted_instruction, memory)
+        scene = perception.scene_summary()
+        if scene:
+            print(f"Scene: {scene}")
+
+        plan = planner.generate_plan(formatted_instruction, memory, scene)
 
         # Execute the plan
         if plan:
-            execute_plan(nao, plan)
+            record_path = None
+            if PLAN_RECORD_DIR:
+                record_path = os.path.join(PLAN_RECORD_DIR, datetime.now().strftime("%Y-%m-%d_%H-%M-%S") + ".npz")
+            execute_plan(nao, plan, library, record_path)
         else:
             print("Failed to generate a plan")
 
     # Stop the nao
+    perception.stop()
+    print(perception.report())
+    print(shared_client.report())
     nao.shutdown()
 
 
@@ -3,6 +3,7 @@ import pyttsx3
 import string
 import time
 import cv2
+from robot_state import RobotStateSnapshot
 
 class Nao(SimulationManager):
     def __init__(self, gui: bool = True, auto_step: bool = True):
@@ -10,6 +11,10 @@ class Nao(SimulationManager):
         self.client_id = self.launchSimulation(gui=gui, auto_step=auto_step)
         self.robot = self.spawnNao(self.client_id, spawn_ground_plane=True)
         self.voice_engine = pyttsx3.init()
+        # shared joint state, read once per simulation step
+        self.state = RobotStateSnapshot(self.robot, manual_step=not auto_step)
+        # background PerceptionWorker, set by main; it owns its camera subscription
+        self.perception = None
     
     #####################################################################################
     ##################################     ACTIONS     ##################################
@@ -17,6 +22,11 @@ class Nao(SimulationManager):
     
     # capture image
     def capture_image(self, camera: str = 'top'):
+        # re-subscribing here would unsubscribe the perception worker's camera
+        if self.perception is not None and self.perception.camera == camera and self.perception.is_alive():
+            img = self.perception.latest_frame()
+            if img is not None:
+                return img
         if camera == 'top':
             handle = self.robot.subscribeCamera(self.robot.ID_CAMERA_TOP, fps=15.0)
             img = self.robot.getCameraFrame(handle)
@@ -84,8 +94,7 @@ class Nao(SimulationManager):
     def wave(self, hand: str = 'right'):
         if hand == 'left':
             # save the current position of the left shoulder
-            prev_pitch = self.robot.getAnglesPosition(['LShoulderPitch'])
-            prev_roll = self.robot.getAnglesPosition(['LShoulderRoll'])
+            prev_pitch, prev_roll = self.state.positions_of(['LShoulderPitch', 'LShoulderRoll'])
             
             # wave the left hand two times
             self.robot.setAngles(['LShoulderPitch', 'LShoulderRoll'], [-1.2, 0.8], 0.5)
@@ -99,8 +108,7 @@ class Nao(SimulationManager):
 
         elif hand == 'right':
             # save the current position of the right shoulder
-            prev_pitch = self.robot.getAnglesPosition(['RShoulderPitch'])
-            prev_roll = self.robot.getAnglesPosition(['RShoulderRoll'])
+            prev_pitch, prev_roll = self.state.positions_of(['RShoulderPitch', 'RShoulderRoll'])
             
             # wave the left hand two times
             self.robot.setAngles(['RShoulderPitch', 'RShoulderRoll'], [-1.2, 0.8], 0.5)
@@ -117,7 +125,7 @@ class Nao(SimulationManager):
     def nod_head(self, direction: str = 'up_down'):
         if direction == 'up_down':
             # save the current position of the head
-            prev_pitch = self.robot.getAnglesPosition(['HeadPitch'])
+            prev_pitch, = self.state.positions_of(['HeadPitch'])
             
             # nod the head two times
             self.robot.setAngles(['HeadPitch'], [-0.5], 0.5)
@@ -128,7 +136,7 @@ class Nao(SimulationManager):
 
         elif direction == 'right_left':
             # save the current position of the head
-            prev_yaw = self.robot.getAnglesPosition(['HeadYaw'])
+            prev_yaw, = self.state.positions_of(['HeadYaw'])
             
             # nod the head two times
             self.robot.setAngles(['HeadYaw'], [-0.5], 0.5)
@@ -185,6 +193,11 @@ class Nao(SimulationManager):
         self.robot.goToPosture("Stand", 0.2)
 
 
+    # step the simulation when auto_step is False, keeping the joint state in sync
+    def step(self):
+        self.stepSimulation(self.client_id)
+        self.state.update()
+
     # shutdown
     def shutdown(self):
         self.stopSimulation(self.client_id)
\ No newline at end of file
@@ -0,0 +1,235 @@
+import time
+import threading
+from collections import deque
+import cv2
+
+class SceneSummary():
+    """
+    Compact result of one processed camera frame.
+    """
+    def __init__(self, captured_at, processed_at, faces, people, skipped):
+        self.captured_at = captured_at
+        self.processed_at = processed_at
+        self.faces = faces
+        self.people = people
+        self.skipped = skipped
+
+    def text(self, now=None):
+        now = time.monotonic() if now is None else now
+        parts = [f"{len(self.faces)} face(s)"]
+        if self.faces:
+            parts[0] += " at " + ", ".join(self.faces)
+        if "faces" in self.skipped:
+            parts = ["face detection skipped"]
+        if "people" in self.skipped:
+            parts.append("person detection skipped")
+        else:
+            parts.append(f"{len(self.people)} person(s)")
+            if self.people:
+                parts[-1] += " at " + ", ".join(self.people)
+        return f"{'; '.join(parts)} in view ({now - self.captured_at:.1f}s ago)"
+
+
+class PerceptionWorker(threading.Thread):
+    """
+    Samples camera frames in the background and keeps the latest scene summary.
+
+    - rate_hz: at most this many frames are processed per second. When a frame
+      takes longer than the period, the missed ticks are dropped instead of
+      queued, so the summary is always built from the newest frame.
+    - max_width: frames are downscaled to this width before detection.
+    - budget: per-frame processing budget in seconds. Each detector (Haar faces,
+      then HOG people) keeps a running estimate of its cost per pixel. It runs
+      on a smaller copy of the frame when the full frame would not fit in what
+      is left of the budget, and is skipped when even the smallest useful
+      frame would not fit.
+
+    The planner reads scene_summary() without waiting for a frame. The worker
+    owns its camera: qiBullet shares one subscription per camera, so other
+    readers should use latest_frame() (Nao.capture_image does). If the camera
+    is unsubscribed elsewhere anyway (e.g. Nao.stream_video), the worker
+    subscribes again on the next tick.
+    """
+    def __init__(self, nao, camera: str = 'top', rate_hz: float = 2.0, max_width: int = 320,
+                 budget: float = 0.05, max_age: float = 5.0):
+        super().__init__(daemon=True)
+        self.nao = nao
+        self.camera = camera
+        self.rate_hz = rate_hz
+        self.period = 1.0 / rate_hz
+        self.max_width = max_width
+        self.budget = budget
+        self.max_age = max_age
+        self.running = threading.Event()
+        self.summary = None
+        self.frame = None
+        self.lock = threading.Lock()
+
+        self.face_detector = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+        self.person_detector = cv2.HOGDescriptor()
+        self.person_detector.setSVMDetector(cv2.HOGDescriptor_getDefaultPeopleDetector())
+
+        self.processing_times = deque(maxlen=500)
+        self.staleness = deque(maxlen=500)
+        self.frames = 0
+        self.dropped_ticks = 0
+        self.over_budget = 0
+        self.camera_errors = 0
+        self.skipped = {"faces": 0, "people": 0}
+        # running estimate of each detector's seconds per pixel, measured on the first frame
+        self.costs = {"faces": None, "people": None}
+
+    @staticmethod
+    def position(x, w, width):
+        center = (x + w / 2.0) / width
+        if center < 1.0 / 3.0:
+            return "left"
+        elif center > 2.0 / 3.0:
+            return "right"
+        return "center"
+
+    def process(self, frame, captured_at):
+        start = time.monotonic()
+        height, width = frame.shape[:2]
+        if width > self.max_width:
+            frame = cv2.resize(frame, (self.max_width, int(height * self.max_width / width)), interpolation=cv2.INTER_AREA)
+            height, width = frame.shape[:2]
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+        skipped = []
+        # the Haar face window is 24x24 pixels, the default people detector window 64x128
+        faces = self.detect("faces", gray, start, (48, 48),
+                            lambda image: self.face_detector.detectMultiScale(image, scaleFactor=1.2, minNeighbors=4, minSize=(20, 20)))
+        people = self.detect("people", gray, start, (128, 64),
+                             lambda image: self.person_detector.detectMultiScale(image, winStride=(8, 8))[0])
+        if faces is None:
+            skipped.append("faces")
+        if people is None:
+            skipped.append("people")
+
+        processed_at = time.monotonic()
+        self.processing_times.append(processed_at - start)
+        if processed_at - start > self.budget:
+            self.over_budget += 1
+        return SceneSummary(captured_at, processed_at, faces or [], people or [], skipped)
+
+    def detect(self, name, gray, start, min_shape, detector):
+        """
+        Run `detector` on a frame sized to fit the rest of the budget and return
+        the positions it found, or None when it was skipped.
+        """
+        image = self.fit_frame(gray, self.budget - (time.monotonic() - start), self.costs[name], min_shape)
+        if image is None:
+            self.skipped[name] += 1
+            return None
+        detector_start = time.monotonic()
+        rects = detector(image)
+        cost = (time.monotonic() - detector_start) / image.size
+        self.costs[name] = cost if self.costs[name] is None else 0.8 * self.costs[name] + 0.2 * cost
+        return [self.position(x, w, image.shape[1]) for (x, y, w, h) in rects]
+
+    @staticmethod
+    def fit_frame(gray, remaining, cost, min_shape):
+        if remaining <= 0:
+            return None
+        if cost is None or cost * gray.size <= remaining:
+            return gray
+        scale = (remaining / (cost * gray.size)) ** 0.5
+        height, width = int(gray.shape[0] * scale), int(gray.shape[1] * scale)
+        if height < min_shape[0] or width < min_shape[1]:
+            return None
+        return cv2.resize(gray, (width, height), interpolation=cv2.INTER_AREA)
+
+    def subscribe(self):
+        if self.camera == 'top':
+            camera_id = self.nao.robot.ID_CAMERA_TOP
+        else:
+            camera_id = self.nao.robot.ID_CAMERA_BOTTOM
+        # the camera renders at the subscribed fps, so only render what is processed
+        return self.nao.robot.subscribeCamera(camera_id, fps=float(self.rate_hz))
+
+    def read_frame(self, handle):
+        """
+        Latest camera frame and the handle to use next time (None if the camera is unavailable).
+        """
+        try:
+            if handle is None:
+                handle = self.subscribe()
+            # the camera keeps only its latest frame, so nothing older is waiting in a queue
+            return self.nao.robot.getCameraFrame(handle), handle
+        except Exception as e:
+            # usually an invalid handle after someone else unsubscribed the shared camera
+            print(f"Perception camera error: {str(e)}, subscribing again")
+            self.camera_errors += 1
+            return None, None
+
+    def run(self):
+        self.running.set()
+        handle = None
+        next_tick = time.monotonic()
+        try:
+            while self.running.is_set():
+                frame, handle = self.read_frame(handle)
+                captured_at = time.monotonic()
+                if frame is not None:
+                    try:
+                        summary = self.process(frame, captured_at)
+                        with self.lock:
+                            self.summary = summary
+                            self.frame = frame
+                        self.frames += 1
+                    except Exception as e:
+                        # one bad frame must not stop perception
+                        print(f"Perception error: {str(e)}")
+
+                next_tick += self.period
+                now = time.monotonic()
+                if now > next_tick:
+                    # fell behind: drop the missed ticks instead of catching up
+                    missed = int((now - next_tick) / self.period) + 1
+                    self.dropped_ticks += missed
+                    next_tick += missed * self.period
+                time.sleep(max(0.0, next_tick - time.monotonic()))
+        finally:
+            if handle is not None:
+                try:
+                    self.nao.robot.unsubscribeCamera(handle)
+                except Exception:
+                    pass
+
+    def stop(self):
+        self.running.clear()
+        if self.is_alive():
+            self.join(timeout=2.0)
+
+    def latest_frame(self):
+        """
+        Latest processed camera frame, or None before the first one.
+        """
+        with self.lock:
+            return self.frame
+
+    def scene_summary(self):
+        """
+        Latest scene description for the planner, or "" when there is no recent frame.
+        """
+        with self.lock:
+            summary = self.summary
+        if summary is None:
+            return ""
+        now = time.monotonic()
+        age = now - summary.captured_at
+        self.staleness.append(age)
+        if age > self.max_age:
+            return ""
+        return summary.text(now)
+
+    def report(self):
+        def p(samples, q):
+            samples = sorted(samples)
+            return samples[min(len(samples) - 1, int(q / 100.0 * len(samples)))] if samples else 0.0
+        return (f"Perception: {self.frames} frames, {self.dropped_ticks} dropped ticks, {self.camera_errors} camera errors, "
+                f"{self.over_budget} over the {self.budget * 1000:.0f}ms budget, "
+                f"{self.skipped['faces']} without face detection, {self.skipped['people']} without person detection, "
+                f"processing p50={p(self.processing_times, 50) * 1000:.1f}ms p95={p(self.processing_times, 95) * 1000:.1f}ms, "
+                f"staleness at read p50={p(self.staleness, 50):.2f}s p95={p(self.staleness, 95):.2f}s")
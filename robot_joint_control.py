@@ -8,6 +8,8 @@ from qibullet import SimulationManager
 from qibullet import PepperVirtual
 from qibullet import NaoVirtual
 from qibullet import RomeoVirtual
+from gesture_trajectory import TrajectoryRecorder
+from robot_state import RobotStateSnapshot
 
 if __name__ == "__main__":
     simulation_manager = SimulationManager()
@@ -33,6 +35,13 @@ if __name__ == "__main__":
 
     time.sleep(1.0)
     joint_parameters = list()
+    state = RobotStateSnapshot(robot)
+
+    # Optionally record the slider session: python robot_joint_control.py <trajectory.npz>
+    record_path = sys.argv[1] if len(sys.argv) > 1 else None
+    recorder = None
+    if record_path:
+        recorder = TrajectoryRecorder(robot)
 
     for name, joint in robot.joint_dict.items():
         if "Finger" not in name and "Thumb" not in name:
@@ -41,9 +50,12 @@ if __name__ == "__main__":
                     name,
                     joint.getLowerLimit(),
                     joint.getUpperLimit(),
-                    robot.getAnglesPosition(name)),
+                    state.positions_of([name])[0]),
                 name))
 
+    if recorder:
+        recorder.start()
+
     try:
         while True:
 
@@ -59,4 +71,8 @@ if __name__ == "__main__":
     except KeyboardInterrupt:
         pass
     finally:
+        if recorder:
+            trajectory = recorder.stop()
+            trajectory.save(record_path)
+            print("Saved {} keyframes ({:.2f}s) to {}".format(len(trajectory), trajectory.duration, record_path))
         simulation_manager.stopSimulation(client)
\ No newline at end of file
@@ -4,6 +4,7 @@ import http.client
 import json
 from dotenv import load_dotenv
 import os 
+from llm_client import shared_client
 # Insert your OpenAI API key directly here
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
@@ -41,7 +42,7 @@ class RobotPlanner:
         self.max_completion_length = 1000
     
 
-    def generate_plan(self, instruction, memory=""):
+    def generate_plan(self, instruction, memory="", scene=""):
         print(f"Generating plan for instruction: {instruction}")
 
     
@@ -83,10 +84,13 @@ class RobotPlanner:
             {"role" : "system", "content": f"Previous Memory/Searched info from net: {memory}"},
             {"role": "user", "content": f"Instruction: {instruction}\n\nCreate a detailed action plan for the NAO robot."}
         ]
+        if scene:
+            # what the robot's camera currently sees, e.g. where the user is standing
+            messages.insert(2, {"role": "system", "content": f"Current scene from your camera: {scene}"})
         
         try:
             print("Sending request to OpenAI API...")
-            response = openai.ChatCompletion.create(
+            response = shared_client.chat_completion(
                 model=self.model,
                 messages=messages,
                 temperature=0.3,
@@ -0,0 +1,71 @@
+import time
+import threading
+import numpy as np
+import pybullet as p
+
+class RobotStateSnapshot():
+    """
+    Joint positions and velocities of a qibullet robot, read with a single
+    pybullet getJointStates call into preallocated arrays.
+
+    Gestures, gesture replay and monitoring share one snapshot instead of each
+    querying pybullet joint by joint.
+
+    - auto stepping (real-time simulation): a read refreshes the arrays only when
+      they are older than one simulation timestep, so several reads in the same
+      step cost one query.
+    - manual stepping (`manual_step=True`): the arrays change only when update()
+      is called after stepSimulation, and reads never query pybullet.
+    """
+    def __init__(self, robot, joint_names=None, manual_step: bool = False):
+        self.robot = robot
+        self.manual_step = manual_step
+        # the timestep the simulation actually uses, 1/240 s unless changed
+        self.period = p.getPhysicsEngineParameters(physicsClientId=robot.getPhysicsClientId())["fixedTimeStep"]
+        if joint_names is None:
+            joint_names = list(robot.joint_dict.keys())
+        self.joint_names = list(joint_names)
+        self.index = {name: i for i, name in enumerate(self.joint_names)}
+        self.joint_ids = [robot.joint_dict[name].getIndex() for name in self.joint_names]
+
+        self.positions = np.zeros(len(self.joint_names), dtype=np.float64)
+        self.velocities = np.zeros(len(self.joint_names), dtype=np.float64)
+        self.timestamp = -np.inf
+        self.lock = threading.Lock()
+
+    def update(self):
+        """
+        Read every joint once. Call after each stepSimulation when stepping manually.
+        """
+        states = p.getJointStates(
+            self.robot.getRobotModel(),
+            self.joint_ids,
+            physicsClientId=self.robot.getPhysicsClientId())
+        with self.lock:
+            for i, state in enumerate(states):
+                self.positions[i] = state[0]
+                self.velocities[i] = state[1]
+            self.timestamp = time.monotonic()
+
+    def refresh(self):
+        if self.manual_step:
+            # only the first read queries pybullet, later ones wait for update()
+            if self.timestamp == -np.inf:
+                self.update()
+        elif time.monotonic() - self.timestamp >= self.period:
+            self.update()
+
+    def positions_of(self, joint_names):
+        self.refresh()
+        with self.lock:
+            return [float(self.positions[self.index[name]]) for name in joint_names]
+
+    def velocities_of(self, joint_names):
+        self.refresh()
+        with self.lock:
+            return [float(self.velocities[self.index[name]]) for name in joint_names]
+
+    def as_dict(self):
+        self.refresh()
+        with self.lock:
+            return {name: (float(self.positions[i]), float(self.velocities[i])) for name, i in self.index.items()}
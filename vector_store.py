@@ -0,0 +1,187 @@
+import os
+import numpy as np
+
+PRECISIONS = ("float16", "int8")
+
+class QuantizedVectorStore():
+    """
+    In-memory memory collection that keeps embeddings in a compact form.
+
+    - "float16": half precision vectors (2x smaller than float32)
+    - "int8": int8 codes with a float16 scale per vector (3.99x smaller), so a
+      vector with large components does not cost precision in the others.
+
+    Codes (and scales) are kept in full chunks of `chunk_size` rows plus an
+    exactly sized tail, so the arrays hold no unused capacity.
+
+    Vectors are normalised when added and searched by cosine similarity directly
+    on the compressed arrays. When `rescore` > 0, the full precision vectors are
+    appended to a float32 file on disk and the top `rescore` candidates are
+    re-scored from it, so RAM only holds the compressed copy.
+
+    Exposes the subset of the chromadb collection API that Database uses
+    (add, query, get, count), so it can replace a chromadb collection.
+    """
+    def __init__(self, name, precision: str = "int8", rescore: int = 0,
+                 storage_dir: str = "database_storage", chunk_size: int = 4096):
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unknown precision '{precision}', expected one of {PRECISIONS}")
+        self.name = name
+        self.precision = precision
+        self.rescore = rescore
+        self.chunk_size = chunk_size
+        self.dim = None
+        self.size = 0
+        self.chunks = []
+        self.tail = None
+        # per-vector int8 scales, chunked like the codes (unused for float16)
+        self.scale_chunks = []
+        self.scale_tail = None
+        self.ids = []
+        self.documents = []
+        self.metadatas = []
+        self.id_set = set()
+
+        self.full_precision_path = None
+        if rescore:
+            os.makedirs(storage_dir, exist_ok=True)
+            self.full_precision_path = os.path.join(storage_dir, f"{name}.f32")
+            # the store is not persistent, start from an empty file like chromadb.Client()
+            open(self.full_precision_path, "wb").close()
+
+    @staticmethod
+    def as_matrix(embeddings):
+        # accept a single embedding or a list of them, like chromadb
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        if matrix.ndim == 1:
+            matrix = matrix[None, :]
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.maximum(norms, 1e-12)
+
+    @staticmethod
+    def with_tail(chunks, tail):
+        return chunks + ([tail] if tail is not None and len(tail) else [])
+
+    def blocks(self):
+        codes = self.with_tail(self.chunks, self.tail)
+        if self.precision == "float16":
+            return [(block, None) for block in codes]
+        return list(zip(codes, self.with_tail(self.scale_chunks, self.scale_tail)))
+
+    def encode(self, vectors):
+        if self.precision == "float16":
+            return vectors.astype(np.float16), None
+        scales = np.maximum(np.abs(vectors).max(axis=1) / 127.0, 1e-6).astype(np.float16)
+        codes = np.clip(np.rint(vectors / scales.astype(np.float32)[:, None]), -127, 127).astype(np.int8)
+        return codes, scales
+
+    def append_rows(self, chunks, tail, rows):
+        if tail is not None:
+            rows = np.concatenate([tail, rows])
+        while len(rows) >= self.chunk_size:
+            chunks.append(rows[:self.chunk_size].copy())
+            rows = rows[self.chunk_size:]
+        # copy so the tail does not keep a larger buffer alive
+        return rows.copy()
+
+    def add(self, documents, embeddings, ids, metadatas=None):
+        vectors = self.as_matrix(embeddings)
+        if metadatas is None:
+            metadatas = [None] * len(documents)
+        if len(vectors) != len(documents) or len(ids) != len(documents) or len(metadatas) != len(documents):
+            raise ValueError("documents, embeddings, ids and metadatas must have the same length")
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match collection dimension {self.dim}")
+
+        # like chromadb, an id that already exists is not added again
+        keep = []
+        for i, id_ in enumerate(ids):
+            if id_ in self.id_set:
+                print(f"Id {id_} already exists in {self.name}, skipping")
+                continue
+            self.id_set.add(id_)
+            keep.append(i)
+        if not keep:
+            return
+        vectors = vectors[keep]
+
+        codes, scales = self.encode(vectors)
+        self.tail = self.append_rows(self.chunks, self.tail, codes)
+        if scales is not None:
+            self.scale_tail = self.append_rows(self.scale_chunks, self.scale_tail, scales)
+        self.size += len(vectors)
+        self.ids.extend(ids[i] for i in keep)
+        self.documents.extend(documents[i] for i in keep)
+        self.metadatas.extend(metadatas[i] for i in keep)
+
+        if self.full_precision_path:
+            with open(self.full_precision_path, "ab") as f:
+                f.write(vectors.astype(np.float32).tobytes())
+
+    def scores(self, query):
+        scores = np.empty(self.size, dtype=np.float32)
+        start = 0
+        # score chunk by chunk so the float32 copy of the codes stays small
+        for block, scales in self.blocks():
+            block_scores = block.astype(np.float32) @ query
+            if scales is not None:
+                block_scores *= scales.astype(np.float32)
+            scores[start:start + len(block)] = block_scores
+            start += len(block)
+        return scores
+
+    def full_precision_rows(self, rows):
+        matrix = np.memmap(self.full_precision_path, dtype=np.float32, mode="r", shape=(self.size, self.dim))
+        return np.asarray(matrix[rows])
+
+    def search(self, query, n_results):
+        scores = self.scores(query)
+        n_candidates = min(self.size, max(n_results, self.rescore))
+        candidates = np.argpartition(-scores, n_candidates - 1)[:n_candidates]
+        if self.rescore:
+            candidates = np.sort(candidates)
+            candidate_scores = self.full_precision_rows(candidates) @ query
+        else:
+            candidate_scores = scores[candidates]
+        order = np.argsort(-candidate_scores)[:n_results]
+        return candidates[order], candidate_scores[order]
+
+    def query(self, query_embeddings, n_results: int = 10):
+        queries = self.as_matrix(query_embeddings)
+        results = {"ids": [], "documents": [], "distances": []}
+        for query in queries:
+            if self.size == 0:
+                rows, similarities = [], []
+            else:
+                rows, similarities = self.search(query, n_results)
+            results["ids"].append([self.ids[i] for i in rows])
+            results["documents"].append([self.documents[i] for i in rows])
+            # cosine distance, smaller is closer
+            results["distances"].append([float(1.0 - s) for s in similarities])
+        return results
+
+    def get(self, ids=None, where=None, where_document=None):
+        rows = range(self.size)
+        if ids is not None:
+            wanted = set(ids)
+            rows = [i for i in rows if self.ids[i] in wanted]
+        if where:
+            # metadata equality, e.g. {"user": "tamim"}
+            rows = [i for i in rows
+                    if self.metadatas[i] and all(self.metadatas[i].get(key) == value for key, value in where.items())]
+        if where_document and "$contains" in where_document:
+            rows = [i for i in rows if where_document["$contains"] in self.documents[i]]
+        return {"ids": [self.ids[i] for i in rows], "documents": [self.documents[i] for i in rows],
+                "metadatas": [self.metadatas[i] for i in rows]}
+
+    def count(self):
+        return self.size
+
+    @property
+    def nbytes(self):
+        """
+        RAM held by the vector arrays (the full precision copy lives on disk).
+        """
+        return sum(block.nbytes + (scales.nbytes if scales is not None else 0) for block, scales in self.blocks())